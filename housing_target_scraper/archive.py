@@ -0,0 +1,233 @@
+"""Append-only archive of raw html fetched while scraping, and offline re-parse over it."""
+
+from typing import List, Optional, Literal, Generator
+from pathlib import Path
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+import threading
+import json
+import gzip
+import os
+
+from diot import Diot
+
+from housing_target_scraper.utils.config_utils import config
+from housing_target_scraper.logger import logger
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+
+SEGMENT_FILENAME = "segment.bin"
+INDEX_FILENAME = "index.jsonl"
+DEFAULT_CODEC = "zstd" if zstandard is not None else "gzip"
+GZIP_LEVEL = 6  # Level 9 costs a lot more CPU for little gain on html
+
+
+def compress(data : bytes, codec : str) -> bytes:
+    """Compress raw bytes with the given codec."""
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("Codec `zstd` requires the `zstandard` package")
+        return zstandard.ZstdCompressor().compress(data)
+    elif codec == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    raise ValueError(f"Unknown archive codec: {codec}")
+
+
+def decompress(data : bytes, codec : str) -> bytes:
+    """Decompress raw bytes with the given codec."""
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("Codec `zstd` requires the `zstandard` package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"Unknown archive codec: {codec}")
+
+
+class HtmlArchive:
+    """Stores raw search and listing html in one append-only segment file.
+
+    Every page is compressed on its own and appended to `segment.bin`. A line
+    is then appended to `index.jsonl` with the url, kind, fetch time and the
+    location of the compressed bytes in the segment, so single pages can be
+    read back without scanning the segment.
+
+    Only one process may write to an archive at a time: appends are serialised
+    with a `threading.Lock`, so two processes sharing a root would record wrong
+    offsets.
+
+    :example:
+        >>> archive = HtmlArchive("data/archive")
+        >>> scraper = TargetHousingScraper(search_link, archive=archive)
+        >>> results = reparse(archive)
+    """
+    KINDS = ("search", "listing")
+
+    def __init__(
+        self,
+        root : str,
+        codec : Literal["zstd", "gzip"] = DEFAULT_CODEC,
+    ):
+        """
+        :param root: directory holding the segment and index files. Created if missing.
+        :param codec: compression used for newly appended pages.
+        """
+        if codec not in ("zstd", "gzip"):
+            raise ValueError(f"Unknown archive codec: {codec}")
+        if codec == "zstd" and zstandard is None:
+            raise ImportError("Codec `zstd` requires the `zstandard` package")
+
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.codec = codec
+        self.segment_path = self.root / SEGMENT_FILENAME
+        self.index_path = self.root / INDEX_FILENAME
+        self._lock = threading.Lock()  # Search pages are archived from a thread pool
+
+
+    def append(self, url : str, html : str, kind : Literal["search", "listing"]) -> dict:
+        """Compress and append a page to the segment, then record it in the index."""
+        if kind not in self.KINDS:
+            raise ValueError(f"Invalid archive record kind: {kind}")
+
+        blob = compress(html.encode("utf-8"), self.codec)
+        with self._lock:
+            with open(self.segment_path, "ab") as segment:
+                offset = segment.seek(0, os.SEEK_END)
+                segment.write(blob)
+            record = {
+                "url" : url,
+                "kind" : kind,
+                "fetched_at" : datetime.now(timezone.utc).isoformat(),
+                "offset" : offset,
+                "length" : len(blob),
+                "codec" : self.codec,
+            }
+            # The index line is written last, so a crash mid-blob leaves it unindexed. A crash
+            # mid-line leaves a torn line, which `records` skips; start after it on a new line.
+            line = json.dumps(record) + "\n"
+            with open(self.index_path, "a+b") as index:
+                size = index.seek(0, os.SEEK_END)
+                if size:
+                    index.seek(size - 1)
+                    if index.read(1) != b"\n":
+                        line = "\n" + line
+                index.write(line.encode("utf-8"))
+
+        return record
+
+
+    def records(
+        self,
+        kind : Optional[Literal["search", "listing"]] = None,
+        latest_only : bool = False,
+    ) -> List[dict]:
+        """Read index records in append order.
+
+        Index lines that cannot be parsed, or that point past the end of the segment
+        (e.g. left by a crash while writing), are logged and skipped.
+
+        :param kind: only return records of this kind.
+        :param latest_only: only return the most recent record per url.
+        """
+        if not self.index_path.exists():
+            return []
+
+        segment_size = self.segment_path.stat().st_size if self.segment_path.exists() else 0
+        records = []
+        with open(self.index_path, encoding="utf-8", errors="replace") as index:
+            for line_num, line in enumerate(index, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping unreadable archive index line {line_num}: {e}")
+                    continue
+                if record["offset"] + record["length"] > segment_size:
+                    logger.warning(f"Skipping archive index line {line_num}: points past the end of the segment")
+                    continue
+                records.append(record)
+
+        if kind:
+            records = [r for r in records if r["kind"] == kind]
+        if latest_only:
+            records = list({r["url"] : r for r in records}.values())
+
+        return records
+
+
+    def read(self, record : dict) -> str:
+        """Read back the html of a single index record."""
+        return read_segment(self.segment_path, record)
+
+
+    def iter_html(
+        self,
+        kind : Optional[Literal["search", "listing"]] = None,
+        latest_only : bool = True,
+    ) -> Generator[tuple, None, None]:
+        """Yield (record, html) pairs from the archive."""
+        for record in self.records(kind, latest_only):
+            yield record, self.read(record)
+
+
+def read_segment(segment_path : Path, record : dict) -> str:
+    """Read and decompress the bytes pointed at by an index record."""
+    with open(segment_path, "rb") as segment:
+        segment.seek(record["offset"])
+        blob = segment.read(record["length"])
+
+    return decompress(blob, record["codec"]).decode("utf-8")
+
+
+def _reparse_record(segment_path : Path, record : dict, css_selector : dict) -> Optional[dict]:
+    """Worker for `reparse`: parse one archived listing page, no network involved."""
+    from housing_target_scraper.website import ListingWebsite
+
+    try:
+        html = read_segment(segment_path, record)
+        return ListingWebsite(record["url"], None, Diot(css_selector)).parse_html(html)
+    except Exception as e:
+        logger.error(f"Unexpected error while re-parsing {record['url']}: {e}")
+        return None
+
+
+def reparse(
+    archive : HtmlArchive,
+    css_selector : Optional[Diot] = None,
+    max_workers : Optional[int] = None,
+    latest_only : bool = True,
+) -> Generator[dict, None, None]:
+    """Run the listing parser over every archived listing page across all cores.
+
+    The result has the same shape as `TargetHousingScraper._async_scrape`, so it
+    can be cleaned and turned into a dataframe the same way.
+
+    :param archive: the archive to read listing pages from.
+    :param css_selector: selectors to parse with. Defaults to `config.css_selector`.
+    :param max_workers: number of worker processes. Defaults to the number of cores.
+    :param latest_only: only parse the most recent snapshot of each url.
+    """
+    css_selector = dict(css_selector or config.css_selector)
+    records = archive.records("listing", latest_only)
+    logger.info(f"Re-parsing {len(records)} archived listings from {archive.root}")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(
+            executor.map(
+                _reparse_record,
+                [archive.segment_path] * len(records),
+                records,
+                [css_selector] * len(records),
+                chunksize=max(1, len(records) // (4 * (max_workers or os.cpu_count() or 1))),
+            )
+        )
+
+    logger.info(f"Finished re-parsing: {sum(r is not None for r in results)} listings")
+
+    return (result for result in results if result is not None)
@@ -1,6 +1,8 @@
 from typing import List, Optional, Generator, Union, Literal
 import asyncio
 import httpx 
+import requests
+import time
 import re
 
 import pandas as pd
@@ -9,6 +11,8 @@ import pgeocode
 
 from housing_target_scraper.utils.config_utils import config
 from housing_target_scraper.website import SearchWebsite, ListingWebsite
+from housing_target_scraper.archive import HtmlArchive
+from housing_target_scraper.utils.latency_utils import LatencyTracker, DEFAULT_HEDGE_QUANTILE
 from housing_target_scraper.logger import logger
 
 
@@ -29,12 +33,19 @@ class TargetHousingScraper:
         "unlimited" : "3",
     }
 
-    def __init__(self, search_link : Optional[str] = None):
+    def __init__(
+        self, 
+        search_link : Optional[str] = None, 
+        archive : Optional[HtmlArchive] = None,
+    ):
         """
         :param search_link: the url link from search page
+        :param archive: optional archive to store the raw fetched html in, see `archive.reparse`.
         """
         self.search_link = search_link
         self.css_selector = config.css_selector
+        self.archive = archive
+        self.deferred_urls = []  # Listing urls left unfinished by the deadline of the last run
     
 
     # ----------------------------------------------------------------- Business methods -----------------------------------------------------------------
@@ -222,47 +233,104 @@ class TargetHousingScraper:
         return full_url
 
 
-    def scrape(self, max_connections=10, raw_data=False) -> Generator[dict, None, None]:
-        """Wrapper to run the async scrape method synchronously."""
+    @staticmethod
+    def clean_results(results : Generator[dict, None, None]) -> Generator[dict, None, None]:
+        """Clean the price and size cols of raw scraped listings."""
+        logger.info("Start data cleaning process...")
+        results = map(
+            lambda d: 
+            TargetHousingScraper.clean_price_col(d, "Price per month:", "Price per month:"), results
+        )
+        results = map(
+            lambda d: 
+            TargetHousingScraper.clean_size_col(d, "Size:", "New Size:"), results
+        )
+        logger.info("Finished cleaning raw data")
+
+        return results
+
+
+    def scrape(
+        self,
+        max_connections=10,
+        raw_data=False,
+        request_timeout : float = 10,
+        hedge_quantile : Optional[float] = DEFAULT_HEDGE_QUANTILE,
+        deadline : Optional[float] = None,
+    ) -> Generator[dict, None, None]:
+        """Wrapper to run the async scrape method synchronously.
+
+        :param request_timeout: timeout in seconds of a single listing request.
+        :param hedge_quantile: latency quantile after which a duplicate listing request is sent.
+            None disables hedging.
+        :param deadline: time budget in seconds for the whole run. Listings not finished by then
+            are cancelled and their urls are kept in `self.deferred_urls`. If the search pages 
+            are not fetched by then, nothing is scraped; the blocking search requests still 
+            finish in the background.
+        """
         logger.info(f"Start scraping url {self.search_link:.150}...")
-        results = asyncio.run(self._async_scrape(max_connections))
+        results = asyncio.run(
+            self._async_scrape(max_connections, request_timeout, hedge_quantile, deadline)
+        )
 
         if not raw_data:
-            logger.info("Start data cleaning process...")
-            results = map(
-                lambda d: 
-                self.clean_price_col(d, "Price per month:", "Price per month:"), results
-            )
-            results = map(
-                lambda d: 
-                self.clean_size_col(d, "Size:", "New Size:"), results
-            )
-            logger.info("Finished cleaning raw data")
+            results = self.clean_results(results)
         
         logger.info(f"Finished scraping url {self.search_link:.150}")
 
         return results
 
 
-    async def _async_scrape(self, max_connections=10) -> List[dict]:
-        """Async scrape all listings based on the given search url."""
+    async def _async_scrape(
+        self, 
+        max_connections=10,
+        request_timeout : float = 10,
+        hedge_quantile : Optional[float] = DEFAULT_HEDGE_QUANTILE,
+        deadline : Optional[float] = None,
+        client : Optional[httpx.AsyncClient] = None,
+        requests_session : Optional[requests.Session] = None,
+        archive : Optional[HtmlArchive] = None,
+    ) -> List[dict]:
+        """Async scrape all listings based on the given search url.
+
+        :param client: client to fetch listings with. A new one is opened and closed when not given.
+        :param requests_session: session to fetch search pages with. A new one is used when not given.
+        :param archive: archive for this run only. Defaults to `self.archive`.
+        """
+        start = time.monotonic()
+        self.deferred_urls = []
+        archive = archive or self.archive
         logger.info("Phase 1: Scrape all individual listings url.")
-        search_website = SearchWebsite(self.search_link)
-        searchable_urls = search_website.get_listing_link()
+        search_website = SearchWebsite(self.search_link, requests_session, archive=archive)
+        # Search pages are fetched with blocking requests, keep them off the event loop
+        try:
+            searchable_urls = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(None, search_website.get_listing_link),
+                timeout=deadline,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Deadline of {deadline}s reached while fetching search pages: no listings scraped")
+            return []
         logger.info(f"Finished Phase 1: got {len(searchable_urls)} urls")
 
         logger.info("Phase 2: Scrape individual url")
         # Shared flag to track if an error happens
         error_occurred = False
-        async with httpx.AsyncClient() as client:
+        latency_tracker = LatencyTracker(hedge_quantile) if hedge_quantile else None
+        owns_client = client is None
+        client = client or httpx.AsyncClient()
+        try:
             sem = asyncio.Semaphore(max_connections)  # Limit concurrency
 
             async def bound_fetch(url):
                 nonlocal error_occurred
                 async with sem:
                     try:
-                        return await ListingWebsite(url, client, self.css_selector).parse_info()
-                    except httpx.RequestError as e:
+                        return await ListingWebsite(
+                            url, client, self.css_selector, archive, 
+                            timeout=request_timeout, latency_tracker=latency_tracker, semaphore=sem,
+                        ).parse_info()
+                    except (httpx.RequestError, httpx.HTTPStatusError) as e:
                         logger.error(f"Request error while fetching {url}: {e}")
                         error_occurred = True
                         return None  # or handle however you'd like
@@ -274,10 +342,26 @@ class TargetHousingScraper:
                 logger.error("Aborting due to previous error.")
                 return [] 
 
-            tasks = [bound_fetch(url) for url in searchable_urls]
-            results = await asyncio.gather(*tasks)
+            tasks = {asyncio.ensure_future(bound_fetch(url)) : url for url in searchable_urls}
+            if not tasks:
+                return []
+
+            # Wait until every listing is done or the deadline for the whole run has passed
+            timeout = max(0, deadline - (time.monotonic() - start)) if deadline is not None else None
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+            self.deferred_urls = [tasks[task] for task in pending]
+            if self.deferred_urls:
+                logger.warning(f"Deadline of {deadline}s reached: deferred {len(self.deferred_urls)} listings")
+
+            results = [task.result() for task in tasks if task in done]
             logger.info(f"Finished Phase 2: Success scraped {len(results)} listings")
             
             # Filter out None results in case of errors
             return (result for result in results if result is not None)
-    
\ No newline at end of file
+        finally:
+            if owns_client:
+                await client.aclose()
@@ -0,0 +1,221 @@
+"""Long-lived scraping session that keeps one http client and event loop warm across searches."""
+
+from typing import Optional, Union, Generator, List, Tuple
+import asyncio
+import threading
+import httpx
+import requests
+
+from housing_target_scraper.scraper import TargetHousingScraper
+from housing_target_scraper.archive import HtmlArchive
+from housing_target_scraper.utils.latency_utils import DEFAULT_HEDGE_QUANTILE
+from housing_target_scraper.logger import logger
+
+
+class ScraperSession:
+    """Owns one `httpx.AsyncClient`, one `requests.Session` and one event loop for many searches.
+
+    By default the loop runs on a background thread, so `scrape` can be called from
+    plain sync code as well as from inside a running loop (Jupyter, async web services)
+    through `await ascrape(...)`. With `background=False` the session attaches to the
+    caller's running loop instead and must be entered with `async with`.
+
+    Both scrape methods return the results together with the listing urls deferred
+    by `deadline`, since a session is shared by many concurrent searches.
+
+    :example:
+        >>> with ScraperSession() as session:
+        ...     results, deferred_urls = session.scrape(search_link)
+
+        >>> async with ScraperSession(background=False) as session:
+        ...     results, deferred_urls = await session.ascrape(search_link)
+    """
+
+    def __init__(
+        self, 
+        background : bool = True,
+        archive : Optional[HtmlArchive] = None,
+        client_kwargs : Optional[dict] = None,
+    ):
+        """
+        :param background: run the session loop on a background thread. If False,
+            attach to the running loop of the caller.
+        :param archive: archive to store the raw fetched html in, for scrapers without their own.
+        :param client_kwargs: extra arguments for the `httpx.AsyncClient`, e.g. `limits` or `headers`.
+        """
+        self.background = background
+        self.archive = archive
+        self.client_kwargs = client_kwargs or {}
+        self.loop = None
+        self.client = None
+        self.requests_session = None
+        self._thread = None
+
+
+    # ----------------------------------------------------------------- Lifecycle -----------------------------------------------------------------
+    def start(self) -> "ScraperSession":
+        """Start the background loop and open the clients on it."""
+        if not self.background:
+            raise RuntimeError("Session attached to the caller's loop must be started with `await astart()`")
+        if self.loop is not None:
+            return self
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="ScraperSession", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open_clients(), self.loop).result()
+        logger.info("Started scraper session on a background loop")
+
+        return self
+
+
+    async def astart(self) -> "ScraperSession":
+        """Start the session from inside a running loop."""
+        if self.background:
+            await asyncio.get_running_loop().run_in_executor(None, self.start)
+            return self
+        if self.loop is not None:
+            return self
+
+        self.loop = asyncio.get_running_loop()
+        await self._open_clients()
+        logger.info("Started scraper session on the running loop")
+
+        return self
+
+
+    def close(self) -> None:
+        """Close the clients and stop the background loop."""
+        if self.loop is None:
+            return
+        if not self.background:
+            raise RuntimeError("Session attached to the caller's loop must be closed with `await aclose()`")
+
+        asyncio.run_coroutine_threadsafe(self._close_clients(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.loop, self._thread = None, None
+        logger.info("Closed scraper session")
+
+
+    async def aclose(self) -> None:
+        """Close the session from inside a running loop."""
+        if self.background:
+            await asyncio.get_running_loop().run_in_executor(None, self.close)
+            return
+        if self.loop is None:
+            return
+
+        await self._close_clients()
+        self.loop = None
+        logger.info("Closed scraper session")
+
+
+    def __enter__(self) -> "ScraperSession":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "ScraperSession":
+        return await self.astart()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+    async def _open_clients(self) -> None:
+        """Open the clients, on the session loop so the connection pool is bound to it."""
+        self.client = httpx.AsyncClient(**self.client_kwargs)
+        self.requests_session = requests.Session()
+
+
+    async def _close_clients(self) -> None:
+        await self.client.aclose()
+        self.requests_session.close()
+        self.client, self.requests_session = None, None
+
+
+    # ----------------------------------------------------------------- Business methods -----------------------------------------------------------------
+    def scrape(
+        self,
+        scraper : Union[str, TargetHousingScraper],
+        max_connections=10,
+        raw_data=False,
+        request_timeout : float = 10,
+        hedge_quantile : Optional[float] = DEFAULT_HEDGE_QUANTILE,
+        deadline : Optional[float] = None,
+    ) -> Tuple[Generator[dict, None, None], List[str]]:
+        """Scrape synchronously, reusing the session clients. See `TargetHousingScraper.scrape`.
+
+        :param scraper: a search url, or a scraper with its search url set.
+
+        :return: the scraped listings and the listing urls deferred by `deadline`.
+        """
+        self._check_started()
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            raise RuntimeError("Cannot block the session loop, use `await session.ascrape(...)` instead")
+
+        return asyncio.run_coroutine_threadsafe(
+            self._scrape(scraper, max_connections, raw_data, request_timeout, hedge_quantile, deadline),
+            self.loop,
+        ).result()
+
+
+    async def ascrape(
+        self,
+        scraper : Union[str, TargetHousingScraper],
+        max_connections=10,
+        raw_data=False,
+        request_timeout : float = 10,
+        hedge_quantile : Optional[float] = DEFAULT_HEDGE_QUANTILE,
+        deadline : Optional[float] = None,
+    ) -> Tuple[Generator[dict, None, None], List[str]]:
+        """Scrape from inside a running loop, reusing the session clients. See `TargetHousingScraper.scrape`.
+
+        :param scraper: a search url, or a scraper with its search url set.
+
+        :return: the scraped listings and the listing urls deferred by `deadline`.
+        """
+        self._check_started()
+        coro = self._scrape(scraper, max_connections, raw_data, request_timeout, hedge_quantile, deadline)
+        if asyncio.get_running_loop() is self.loop:
+            return await coro
+
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+
+    async def _scrape(
+        self,
+        scraper : Union[str, TargetHousingScraper],
+        max_connections,
+        raw_data,
+        request_timeout,
+        hedge_quantile,
+        deadline,
+    ) -> Tuple[Generator[dict, None, None], List[str]]:
+        """Run a scrape on the session loop with the session clients."""
+        if isinstance(scraper, str):
+            scraper = TargetHousingScraper(scraper)
+
+        logger.info(f"Start scraping url {scraper.search_link:.150}...")
+        results = await scraper._async_scrape(
+            max_connections, request_timeout, hedge_quantile, deadline,
+            client=self.client, requests_session=self.requests_session,
+            archive=scraper.archive or self.archive,
+        )
+        if not raw_data:
+            results = scraper.clean_results(results)
+        logger.info(f"Finished scraping url {scraper.search_link:.150}")
+
+        return results, scraper.deferred_urls
+
+
+    def _check_started(self) -> None:
+        if self.loop is None:
+            raise RuntimeError("Scraper session is not started, use it as a context manager or call `start()`")
@@ -0,0 +1,124 @@
+from typing import Awaitable, Callable, Optional, TypeVar
+from collections import deque
+import asyncio
+import time
+import math
+
+DEFAULT_HEDGE_QUANTILE = 0.95
+DEFAULT_WINDOW = 200
+DEFAULT_MIN_SAMPLES = 20
+HEDGE_RECHECK_INTERVAL = 0.1  # Seconds between threshold checks while too few latencies are known
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Keeps a rolling window of observed fetch latencies to decide when to hedge."""
+
+    def __init__(
+        self,
+        quantile : float = DEFAULT_HEDGE_QUANTILE,
+        window : int = DEFAULT_WINDOW,
+        min_samples : int = DEFAULT_MIN_SAMPLES,
+    ):
+        """
+        :param quantile: the latency quantile after which a request is hedged, e.g. 0.95 for p95.
+        :param window: number of most recent latencies to keep.
+        :param min_samples: no hedging threshold is given until this many latencies are observed.
+        """
+        if not 0 < quantile < 1:
+            raise ValueError(f"Input value for quantile must be between 0 and 1: {quantile}")
+
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds : float) -> None:
+        """Record the latency of a finished fetch."""
+        self.samples.append(seconds)
+
+    def threshold(self) -> Optional[float]:
+        """Latency at the tracked quantile, or None while there are too few samples."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(self.quantile * len(ordered)) - 1)]
+
+
+async def hedged_call(
+    factory : Callable[[], Awaitable[T]], 
+    hedge_after : Optional[float] = None,
+    tracker : Optional[LatencyTracker] = None,
+    semaphore : Optional[asyncio.Semaphore] = None,
+) -> T:
+    """Await `factory()`, firing a duplicate call once the first one is slow.
+
+    The first call to succeed wins and the other one is cancelled. If both fail,
+    the error of the original call is raised.
+
+    Only the latency of the original call is recorded, including when it is cancelled
+    after losing to the duplicate: dropping slow losers, or timing duplicates from when
+    they were fired, would pull the tracked quantile down and make hedging ever more eager.
+
+    :param factory: creates a fresh awaitable for every attempt.
+    :param hedge_after: fixed seconds to wait before hedging. When None, the threshold 
+        of `tracker` is used, re-read while the call is in flight. Without either, 
+        no hedging is done.
+    :param tracker: records the latency of the original call.
+    :param semaphore: concurrency limit the duplicate must take a slot of. Once the call 
+        is slow, the duplicate waits for a free slot, unless the original finishes first.
+    """
+    start = time.perf_counter()
+
+    def record_latency(attempt : asyncio.Future) -> None:
+        if attempt.cancelled() or attempt.exception() is None:
+            tracker.record(time.perf_counter() - start)
+
+    primary = asyncio.ensure_future(factory())
+    if tracker is not None:
+        primary.add_done_callback(record_latency)
+    if hedge_after is None and tracker is None:
+        return await primary
+
+    attempts = [primary]
+    acquire = None
+    try:
+        # Wait until the call is slower than the threshold, which may only become known later
+        while not primary.done():
+            threshold = hedge_after if hedge_after is not None else tracker.threshold()
+            if threshold is None:
+                wait = HEDGE_RECHECK_INTERVAL
+            else:
+                wait = threshold - (time.perf_counter() - start)
+                if wait <= 0:
+                    break
+            await asyncio.wait(attempts, timeout=wait)
+
+        if not primary.done() and semaphore is not None:
+            acquire = asyncio.ensure_future(semaphore.acquire())
+            await asyncio.wait([primary, acquire], return_when=asyncio.FIRST_COMPLETED)
+
+        if not primary.done():
+            hedge = asyncio.ensure_future(factory())
+            if acquire is not None:
+                acquire = None  # The duplicate owns the slot now
+                hedge.add_done_callback(lambda _: semaphore.release())
+            attempts.append(hedge)
+
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result()
+
+        return primary.result()  # Both attempts failed, raise the original error
+    finally:
+        if acquire is not None:
+            if not acquire.done():
+                acquire.cancel()
+            elif not acquire.cancelled():
+                semaphore.release()  # Got a slot, but the original finished first
+        for attempt in attempts:
+            if not attempt.done():
+                attempt.cancel()
@@ -4,12 +4,14 @@ from typing import List, Optional
 from urllib.parse import urlparse, parse_qs, urlunparse
 from concurrent.futures import ThreadPoolExecutor
 import itertools
+import asyncio
 import httpx
 
 from bs4 import BeautifulSoup, element
 from diot import Diot
 
-from housing_target_scraper.listing import Listing
+from housing_target_scraper.archive import HtmlArchive
+from housing_target_scraper.utils.latency_utils import LatencyTracker, hedged_call
 from housing_target_scraper.logger import logger
 
 
@@ -34,22 +36,29 @@ class SearchWebsite:
     def __init__(
         self, 
         search_url : str, 
-        requests_session: Optional[requests.Session] = None
-
+        requests_session: Optional[requests.Session] = None,
+        archive : Optional[HtmlArchive] = None,
     ):
         if requests_session is not None and not isinstance(requests_session, requests.Session):
             raise ValueError(f"Invalid requests.Session object passed: {requests_session}")
 
         self.requests_session = requests_session or requests.Session()  # Or for fallback value
         self.search_url = search_url if self.is_search_url_valid(search_url) else None
+        self.archive = archive
 
 
     @staticmethod
-    def get_html(requests_session : requests.Session, search_url : str) -> BeautifulSoup:
+    def get_html(
+        requests_session : requests.Session, 
+        search_url : str, 
+        archive : Optional[HtmlArchive] = None,
+    ) -> BeautifulSoup:
         """Send GET to server with corresponding search url. Return bs4 object."""
         try:
             page = requests_session.get(search_url, timeout=10)
             page.raise_for_status()
+            if archive is not None:
+                archive.append(search_url, page.text, "search")
             return BeautifulSoup(page.text, features="lxml")
         except requests.RequestException as e:
             logger.error(f"Error fetching {search_url}: {e}")
@@ -66,7 +75,7 @@ class SearchWebsite:
 
     def parse_individual_paginated_url(self, paginated_url) -> List[str]:
         """Parse individual paginated url and return a list of url to individual listing."""
-        soup = self.get_html(self.requests_session, paginated_url)
+        soup = self.get_html(self.requests_session, paginated_url, self.archive)
 
         result = [
             self.ROOT_URL + e.find_next().get("href") 
@@ -79,7 +88,7 @@ class SearchWebsite:
 
     def get_listing_link(self) -> List[str]:
         """Fetch all urls to individual listing site."""
-        soup = self.get_html(self.requests_session, self.search_url)
+        soup = self.get_html(self.requests_session, self.search_url, self.archive)
         # Find the last page available
         try:
             page_elements = soup.find("div", {"class": "pager"}).children
@@ -136,10 +145,24 @@ class ListingWebsite:
         url : str, 
         client : httpx.AsyncClient,
         css_selector : Diot, 
+        archive : Optional[HtmlArchive] = None,
+        timeout : float = 10,
+        latency_tracker : Optional[LatencyTracker] = None,
+        semaphore : Optional[asyncio.Semaphore] = None,
     ) -> None:
+        """
+        :param timeout: timeout in seconds of a single GET request.
+        :param latency_tracker: shared latency stats. When given, a fetch slower than 
+            the tracked quantile is hedged with a duplicate request.
+        :param semaphore: shared concurrency limit. A duplicate request waits for its own slot.
+        """
         self.url = url
         self.css_selector = css_selector
         self.client = client 
+        self.archive = archive
+        self.timeout = timeout
+        self.latency_tracker = latency_tracker
+        self.semaphore = semaphore
     
 
     @staticmethod
@@ -167,15 +190,34 @@ class ListingWebsite:
         )
         
 
-    async def parse_info(self) -> List[Listing]:
-        """Parse information from the given url."""
+    async def fetch(self) -> str:
+        """Send a single GET to the listing url and return the html. Error statuses raise."""
+        response = await self.client.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+
+        return response.text
+
+
+    async def parse_info(self) -> dict:
+        """Parse information from the given url.
+
+        Raises `httpx.RequestError` if the fetch fails and `httpx.HTTPStatusError` on error statuses.
+        """
         logger.info(f"Fetching info from listing url: {self.url}")
-        try:
-            response = await self.client.get(self.url, timeout=10)
-        except httpx.RequestError as e:
-            return self.url, f"Error: {e}"
-        
-        soup = BeautifulSoup(response.text, features="lxml")
+        html = await hedged_call(self.fetch, tracker=self.latency_tracker, semaphore=self.semaphore)
+
+        if self.archive is not None:
+            # Compressing and writing blocks, keep it off the (possibly shared) event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.archive.append, self.url, html, "listing"
+            )
+
+        return self.parse_html(html)
+
+
+    def parse_html(self, html : str) -> dict:
+        """Parse listing information from the raw html of the listing page."""
+        soup = BeautifulSoup(html, features="lxml")
         fact_list = soup.select(self.css_selector.fact_list)
         results = {
             li_element.contents[1].text.strip(): li_element.contents[3].text.strip()
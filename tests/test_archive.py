@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import httpx
+import pytest
+from housing_target_scraper.archive import HtmlArchive, reparse
+from housing_target_scraper.scraper import TargetHousingScraper
+from housing_target_scraper.utils.config_utils import config
+from housing_target_scraper.website import ListingWebsite, SearchWebsite
+
+
+class TestHtmlArchive:
+    def test_append_and_read(self, tmp_path):
+        """
+        Test that appended pages can be read back from the segment through the index.
+        """
+        archive = HtmlArchive(tmp_path, codec="gzip")
+        archive.append("https://www.housingtarget.com/a", "<html>a</html>", "listing")
+        archive.append("https://www.housingtarget.com/s", "<html>s</html>", "search")
+
+        records = archive.records()
+        assert [r["url"] for r in records] == [
+            "https://www.housingtarget.com/a", "https://www.housingtarget.com/s"
+        ]
+        assert [archive.read(r) for r in records] == ["<html>a</html>", "<html>s</html>"]
+
+
+    def test_records_latest_only(self, tmp_path):
+        """
+        Test that `latest_only` keeps the most recent snapshot of each url.
+        """
+        archive = HtmlArchive(tmp_path, codec="gzip")
+        archive.append("https://www.housingtarget.com/a", "old", "listing")
+        archive.append("https://www.housingtarget.com/s", "search", "search")
+        archive.append("https://www.housingtarget.com/a", "new", "listing")
+
+        records = archive.records("listing", latest_only=True)
+        assert len(records) == 1
+        assert archive.read(records[0]) == "new"
+
+
+    @pytest.mark.parametrize("kwargs", [{"codec" : "lz4"}])
+    def test_invalid_codec(self, tmp_path, kwargs):
+        """
+        Test that an unknown codec is rejected.
+        """
+        with pytest.raises(ValueError):
+            HtmlArchive(tmp_path, **kwargs)
+
+
+    def test_records_skip_torn_lines(self, tmp_path):
+        """
+        Test that a torn index line or one pointing past the segment is skipped, and appends still work.
+        """
+        archive = HtmlArchive(tmp_path, codec="gzip")
+        archive.append("https://www.housingtarget.com/a", "a", "listing")
+        with open(archive.index_path, "a") as index:
+            index.write('{"url": "x", "kind": "listing", "offset": 0, "length": 100000, "codec": "gzip"}\n')
+            index.write('{"url": "x", "ki')
+        archive.append("https://www.housingtarget.com/b", "b", "listing")
+
+        assert [archive.read(r) for r in archive.records()] == ["a", "b"]
+
+
+LISTING_URL = "https://www.housingtarget.com/netherlands/housing-rentals/amsterdam/apartment/1"
+LISTING_HTML = """
+<html><body>
+<div id="ad_facts"><ul>
+<li class="fact">
+<span>Price per month:</span>
+<span>1,200 EUR</span>
+</li>
+<li class="fact no-value">
+<span>Size:</span>
+<span></span>
+</li>
+</ul></div>
+<div class="desc">Nice flat<br/>Area: Centrum<br/>Zipcode: 1011</div>
+</body></html>
+"""
+LISTING_DICT = {
+    "Price per month:" : "1,200 EUR",
+    "zipcode" : None,
+    "area" : None,
+    "desc" : "",
+    "url" : LISTING_URL,
+}
+
+
+class TestReparse:
+    def test_parse_html(self):
+        """
+        Test that a listing page is parsed without any network access.
+        """
+        assert ListingWebsite(LISTING_URL, None, config.css_selector).parse_html(LISTING_HTML) == LISTING_DICT
+
+
+    def test_reparse_process_pool(self, tmp_path):
+        """
+        Test that archived listings are re-parsed across worker processes.
+        """
+        archive = HtmlArchive(tmp_path, codec="gzip")
+        archive.append(LISTING_URL, LISTING_HTML, "listing")
+        archive.append(LISTING_URL + "/broken", "<html></html>", "listing")
+        archive.append("https://www.housingtarget.com/search", "<html></html>", "search")
+
+        assert list(reparse(archive, max_workers=2)) == [LISTING_DICT]
+
+
+    def test_scraper_archives_listings(self, tmp_path, monkeypatch):
+        """
+        Test that the scraper archives successful listing pages only.
+        """
+        monkeypatch.setattr(
+            SearchWebsite, "get_listing_link", lambda self: [LISTING_URL, LISTING_URL + "/gone"]
+        )
+
+        def handler(request):
+            if request.url.path.endswith("/gone"):
+                return httpx.Response(404, text="Not found")
+            return httpx.Response(200, text=LISTING_HTML)
+
+        async def main():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return list(await scraper._async_scrape(client=client))
+
+        archive = HtmlArchive(tmp_path, codec="gzip")
+        scraper = TargetHousingScraper("https://www.housingtarget.com/netherlands/housing-rentals", archive)
+
+        assert asyncio.run(main()) == [LISTING_DICT]
+        assert [r["url"] for r in archive.records("listing")] == [LISTING_URL]
+
+
+    def test_listing_archived_off_event_loop(self, tmp_path, monkeypatch):
+        """
+        Test that listing pages are compressed and written outside the event loop thread.
+        """
+        archive = HtmlArchive(tmp_path, codec="gzip")
+        append = archive.append
+        threads = []
+
+        def tracked_append(*args):
+            threads.append(threading.current_thread())
+            return append(*args)
+
+        monkeypatch.setattr(archive, "append", tracked_append)
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=LISTING_HTML)))
+
+        async def main():
+            async with client:
+                return await ListingWebsite(LISTING_URL, client, config.css_selector, archive).parse_info()
+
+        assert asyncio.run(main()) == LISTING_DICT
+        assert threads and threads[0] is not threading.main_thread()
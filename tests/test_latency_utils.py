@@ -0,0 +1,169 @@
+import asyncio
+import pytest
+from housing_target_scraper.utils.latency_utils import LatencyTracker, hedged_call
+
+
+class TestLatencyTracker:
+    def test_threshold_needs_min_samples(self):
+        """
+        Test that no hedging threshold is given before enough latencies are observed.
+        """
+        tracker = LatencyTracker(quantile=0.95, min_samples=5)
+        for seconds in [0.1, 0.2, 0.3, 0.4]:
+            tracker.record(seconds)
+        assert tracker.threshold() is None
+
+        tracker.record(0.5)
+        assert tracker.threshold() == 0.5
+
+
+    def test_threshold_quantile(self):
+        """
+        Test that the threshold is the latency at the tracked quantile.
+        """
+        tracker = LatencyTracker(quantile=0.9, min_samples=1)
+        for seconds in range(1, 11):
+            tracker.record(seconds)
+        assert tracker.threshold() == 9
+
+
+    @pytest.mark.parametrize("quantile", [0, 1, 1.5])
+    def test_invalid_quantile(self, quantile):
+        """
+        Test that a quantile outside (0, 1) is rejected.
+        """
+        with pytest.raises(ValueError):
+            LatencyTracker(quantile=quantile)
+
+
+class TestHedgedCall:
+    @staticmethod
+    def make_factory(delays):
+        """Factory whose n-th call sleeps delays[n] and returns n."""
+        calls = []
+
+        async def factory():
+            attempt = len(calls)
+            calls.append(attempt)
+            await asyncio.sleep(delays[attempt])
+            return attempt
+
+        return factory, calls
+
+
+    def test_no_hedge_when_fast(self):
+        """
+        Test that a call finishing before `hedge_after` is not duplicated.
+        """
+        factory, calls = self.make_factory([0.01, 0.01])
+        assert asyncio.run(hedged_call(factory, hedge_after=0.5)) == 0
+        assert calls == [0]
+
+
+    def test_hedge_wins_over_straggler(self):
+        """
+        Test that a slow call is hedged and the faster duplicate wins.
+        """
+        factory, calls = self.make_factory([5, 0.01])
+        assert asyncio.run(hedged_call(factory, hedge_after=0.05)) == 1
+        assert calls == [0, 1]
+
+
+    def test_hedge_falls_back_on_error(self):
+        """
+        Test that the original call still wins when the duplicate fails.
+        """
+        calls = []
+
+        async def factory():
+            calls.append(len(calls))
+            if len(calls) == 2:
+                raise ConnectionError("duplicate failed")
+            await asyncio.sleep(0.1)
+            return "primary"
+
+        assert asyncio.run(hedged_call(factory, hedge_after=0.01)) == "primary"
+
+
+    def test_hedge_waits_for_free_slot(self):
+        """
+        Test that the duplicate waits for a free slot, and is not fired if the original finishes first.
+        """
+        factory, calls = self.make_factory([0.1, 0.01])
+
+        async def main():
+            semaphore = asyncio.Semaphore(1)
+            async with semaphore:  # The slot held by the original call
+                result = await hedged_call(factory, hedge_after=0.01, semaphore=semaphore)
+            return result, semaphore._value
+
+        assert asyncio.run(main()) == (0, 1)
+        assert calls == [0]
+
+
+    def test_hedge_fires_once_slot_frees(self):
+        """
+        Test that a slow call is hedged as soon as another task gives back its slot.
+        """
+        factory, calls = self.make_factory([5, 0.01])
+
+        async def main():
+            semaphore = asyncio.Semaphore(2)
+            await semaphore.acquire()  # Held by another request until it finishes
+            asyncio.get_running_loop().call_later(0.1, semaphore.release)
+            async with semaphore:
+                return await hedged_call(factory, hedge_after=0.01, semaphore=semaphore)
+
+        assert asyncio.run(main()) == 1
+        assert calls == [0, 1]
+
+
+    def test_threshold_read_while_in_flight(self):
+        """
+        Test that a call started before the tracker knows a threshold is still hedged later.
+        """
+        tracker = LatencyTracker(min_samples=1)
+        factory, calls = self.make_factory([5, 0.01])
+
+        async def main():
+            asyncio.get_running_loop().call_later(0.05, tracker.record, 0.01)
+            return await hedged_call(factory, tracker=tracker)
+
+        assert asyncio.run(main()) == 1
+        assert calls == [0, 1]
+
+
+    def test_hedge_takes_and_releases_slot(self):
+        """
+        Test that a duplicate holds its own slot while running and gives it back afterwards.
+        """
+        factory, calls = self.make_factory([5, 0.05])
+
+        async def main():
+            semaphore = asyncio.Semaphore(2)
+            async with semaphore:
+                call = asyncio.ensure_future(hedged_call(factory, hedge_after=0.01, semaphore=semaphore))
+                await asyncio.sleep(0.03)
+                assert semaphore.locked()
+                result = await call
+            await asyncio.sleep(0)  # Let the cancelled original call and callbacks finish
+            return result, semaphore._value
+
+        assert asyncio.run(main()) == (1, 2)
+        assert calls == [0, 1]
+
+
+    def test_cancelled_original_latency_recorded(self):
+        """
+        Test that the original call's latency is recorded even when it loses to the duplicate.
+        """
+        tracker = LatencyTracker(min_samples=1)
+        factory, _ = self.make_factory([5, 0.05])
+
+        async def main():
+            result = await hedged_call(factory, hedge_after=0.05, tracker=tracker)
+            await asyncio.sleep(0)
+            return result
+
+        assert asyncio.run(main()) == 1
+        assert len(tracker.samples) == 1 and tracker.samples[0] >= 0.1
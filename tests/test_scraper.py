@@ -1,5 +1,9 @@
+import asyncio
+import threading
+import httpx
 import pytest
 from housing_target_scraper.scraper import TargetHousingScraper
+from housing_target_scraper.website import SearchWebsite
 
 
 class TestClean:
@@ -98,4 +102,98 @@ class TestClean:
             listing_dict, size_colname, new_size_colname, measurement_colname
         )
 
-        assert cleaned_dict == expected
\ No newline at end of file
+        assert cleaned_dict == expected
+
+SEARCH_URL = "https://www.housingtarget.com/netherlands/housing-rentals"
+LISTING_URLS = [f"https://www.housingtarget.com/netherlands/housing-rentals/amsterdam/{i}" for i in range(30)]
+LISTING_HTML = '<html><body><div class="desc">Nice flat</div></body></html>'
+
+
+class TestAsyncScrape:
+    @staticmethod
+    def run_scrape(scraper, handler, **kwargs):
+        async def main():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return list(await scraper._async_scrape(client=client, **kwargs))
+
+        return asyncio.run(main())
+
+
+    def test_deadline_defers_unfinished(self, monkeypatch):
+        """
+        Test that listings unfinished at the deadline are cancelled, deferred, and reset on the next run.
+        """
+        slow_url = LISTING_URLS[0] + "/slow"
+        urls = LISTING_URLS + [slow_url]
+        monkeypatch.setattr(SearchWebsite, "get_listing_link", lambda self: urls)
+        cancelled = []
+
+        async def handler(request):
+            if str(request.url) == slow_url:
+                try:
+                    await asyncio.sleep(30)
+                except asyncio.CancelledError:
+                    cancelled.append(str(request.url))
+                    raise
+            return httpx.Response(200, text=LISTING_HTML)
+
+        scraper = TargetHousingScraper(SEARCH_URL)
+        results = self.run_scrape(scraper, handler, max_connections=10, deadline=1.0)
+
+        assert len(results) == 30
+        assert scraper.deferred_urls == [slow_url]
+        assert cancelled and set(cancelled) == {slow_url}
+
+        urls.remove(slow_url)
+        assert len(self.run_scrape(scraper, handler, deadline=1.0)) == 30
+        assert scraper.deferred_urls == []
+
+
+    def test_deadline_bounds_search_phase(self, monkeypatch):
+        """
+        Test that a search phase outlasting the deadline ends the run without scraping listings.
+        """
+        release = threading.Event()
+        monkeypatch.setattr(SearchWebsite, "get_listing_link", lambda self: release.wait(5) and LISTING_URLS)
+
+        async def main():
+            task = asyncio.ensure_future(TargetHousingScraper(SEARCH_URL)._async_scrape(deadline=0.1))
+            done, _ = await asyncio.wait([task], timeout=3)
+            release.set()  # Let the search thread finish so the loop can shut down
+            return list(task.result()) if done else None
+
+        assert asyncio.run(main()) == []
+
+
+    def test_hedging_removes_stragglers(self, monkeypatch):
+        """
+        Test that stragglers are hedged through the shared concurrency limit, so none decides the run time.
+        """
+        urls = [f"{SEARCH_URL}/amsterdam/{i}" for i in range(200)]
+        slow_urls = set(urls[::33])  # Including the first ones, started before any latency is known
+        monkeypatch.setattr(SearchWebsite, "get_listing_link", lambda self: urls)
+        requests_per_url, cancelled = {}, []
+        in_flight = peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            url = str(request.url)
+            requests_per_url[url] = requests_per_url.get(url, 0) + 1
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                # Only the first request of a straggler hangs, far longer than the test may take
+                await asyncio.sleep(60 if url in slow_urls and requests_per_url[url] == 1 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+            finally:
+                in_flight -= 1
+            return httpx.Response(200, text=LISTING_HTML)
+
+        results = self.run_scrape(TargetHousingScraper(SEARCH_URL), handler, max_connections=10)
+
+        assert len(results) == 200
+        assert set(cancelled) == slow_urls
+        assert all(requests_per_url[url] == 2 for url in slow_urls)
+        assert peak <= 10
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import httpx
+import pytest
+from housing_target_scraper.archive import HtmlArchive
+from housing_target_scraper.scraper import TargetHousingScraper
+from housing_target_scraper.session import ScraperSession
+from housing_target_scraper.website import SearchWebsite
+
+
+@pytest.fixture
+def fake_scrape(monkeypatch):
+    """Replace the network scrape with one that reports the client and thread it ran with."""
+    async def _async_scrape(self, *args, client=None, requests_session=None, archive=None):
+        return iter([{
+            "url" : self.search_link,
+            "client" : id(client),
+            "thread" : threading.current_thread().name,
+        }])
+
+    monkeypatch.setattr(TargetHousingScraper, "_async_scrape", _async_scrape)
+
+
+class TestScraperSession:
+    def test_background_session_reuses_client(self, fake_scrape):
+        """
+        Test that sync scrapes run on the background loop and share one client.
+        """
+        with ScraperSession() as session:
+            first = list(session.scrape("first", raw_data=True)[0])
+            second = list(session.scrape("second", raw_data=True)[0])
+
+        assert first[0]["client"] == second[0]["client"]
+        assert first[0]["thread"] == second[0]["thread"] == "ScraperSession"
+
+
+    def test_background_session_inside_running_loop(self, fake_scrape):
+        """
+        Test that a background session can be awaited from another running loop.
+        """
+        async def main():
+            async with ScraperSession() as session:
+                return list((await session.ascrape("url", raw_data=True))[0])
+
+        assert asyncio.run(main())[0]["thread"] == "ScraperSession"
+
+
+    def test_attached_session(self, fake_scrape):
+        """
+        Test that an attached session runs on the caller's loop and refuses to block it.
+        """
+        async def main():
+            async with ScraperSession(background=False) as session:
+                with pytest.raises(RuntimeError):
+                    session.scrape("url")
+                return list((await session.ascrape("url", raw_data=True))[0])
+
+        assert asyncio.run(main())[0]["thread"] == threading.current_thread().name
+
+
+    def test_scrape_before_start(self):
+        """
+        Test that scraping with a session that is not started is rejected.
+        """
+        with pytest.raises(RuntimeError):
+            ScraperSession().scrape("url")
+
+
+    def test_session_drives_real_scrape(self, tmp_path, monkeypatch):
+        """
+        Test that real scrapes borrow the session clients, archive and report deferred urls.
+        """
+        search_url = "https://www.housingtarget.com/netherlands/housing-rentals"
+        listing_urls = [search_url + f"/amsterdam/{i}" for i in range(3)]
+        phase_1 = []
+
+        def get_listing_link(self):
+            phase_1.append((self.requests_session, threading.current_thread().name))
+            return listing_urls
+
+        monkeypatch.setattr(SearchWebsite, "get_listing_link", get_listing_link)
+
+        def handler(request):
+            return httpx.Response(200, text='<html><body><div class="desc">Nice flat</div></body></html>')
+
+        archive = HtmlArchive(tmp_path, codec="gzip")
+        session = ScraperSession(archive=archive, client_kwargs={"transport" : httpx.MockTransport(handler)})
+        with session:
+            first, first_deferred = session.scrape(search_url, raw_data=True)
+            scraper = TargetHousingScraper(search_url)
+            second, _ = session.scrape(scraper, raw_data=True)
+            client = session.client
+
+            assert not client.is_closed
+            assert len(list(first)) == len(list(second)) == 3
+            assert first_deferred == []
+            assert [requests_session for requests_session, _ in phase_1] == [session.requests_session] * 2
+            assert all(thread != "ScraperSession" for _, thread in phase_1)  # Off the session loop
+
+        assert client.is_closed
+        assert len(archive.records("listing")) == 6
+        assert scraper.archive is None  # The session archive is used for the run only